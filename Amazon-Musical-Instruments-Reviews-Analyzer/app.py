@@ -1,12 +1,20 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import json
-from collections import Counter
 import re
 from textblob import TextBlob
 import plotly.express as px
 import plotly.graph_objects as go
 import os
+import glob
+import hashlib
+
+# Words too common to be meaningful in the top-words view
+STOP_WORDS = frozenset({'the', 'and', 'for', 'are', 'but', 'not', 'you', 'all', 'can', 'had', 'her', 'was', 'one', 'our', 'out', 'day', 'get', 'has', 'him', 'his', 'how', 'man', 'new', 'now', 'old', 'see', 'two', 'way', 'who', 'boy', 'did', 'its', 'let', 'put', 'say', 'she', 'too', 'use'})
+
+# Words of three or more letters, matched after lowercasing
+_WORD_RE = re.compile(r'\b[a-z]{3,}\b')
 
 # Set page config
 st.set_page_config(
@@ -16,7 +24,8 @@ st.set_page_config(
 )
 
 # Custom CSS for better styling
-st.markdown("""
+# Whitespace is collapsed so each rerun sends a smaller style block
+CSS = re.sub(r'\s+', ' ', """
 <style>
     .main-header {
         font-size: 3rem;
@@ -52,17 +61,78 @@ st.markdown("""
         font-weight: bold;
     }
 </style>
-""", unsafe_allow_html=True)
+""").strip()
+
+st.markdown(CSS, unsafe_allow_html=True)
+
+def parquet_cache_path(csv_path, columns, dtype, index_col=None):
+    """Get the Parquet copy path for a CSV read with the given options
+    
+    The file name carries a hash of the read options, so changing the
+    columns or dtypes writes a fresh copy instead of reusing a stale schema.
+    """
+    options = repr((sorted(columns), sorted(dtype.items()), index_col))
+    options_key = hashlib.md5(options.encode()).hexdigest()[:8]
+    return f"{os.path.splitext(csv_path)[0]}.{options_key}.parquet"
 
-@st.cache_data
+def read_csv_cached(csv_path, columns, dtype, index_col=None):
+    """Read the given columns of a CSV through a Parquet copy that is written on first load"""
+    parquet_path = parquet_cache_path(csv_path, columns, dtype, index_col)
+    
+    # Reuse the Parquet copy unless the CSV has changed since it was written
+    if os.path.exists(parquet_path) and (
+        not os.path.exists(csv_path) or os.path.getmtime(parquet_path) >= os.path.getmtime(csv_path)
+    ):
+        try:
+            return pd.read_parquet(parquet_path, engine='pyarrow')
+        except Exception:
+            # A damaged copy falls back to the CSV and is rewritten below
+            pass
+    
+    # A callable usecols skips missing columns so load_data can report them
+    data = pd.read_csv(csv_path, usecols=lambda col: col in columns, dtype=dtype, index_col=index_col)
+    
+    # Write to a temporary file first so an interrupted write never leaves a partial copy
+    tmp_path = f"{parquet_path}.{os.getpid()}.tmp"
+    try:
+        data.to_parquet(tmp_path, engine='pyarrow')
+        os.replace(tmp_path, parquet_path)
+        
+        # Remove copies written with older read options
+        for stale_path in glob.glob(os.path.splitext(csv_path)[0] + '.*.parquet'):
+            if stale_path != parquet_path:
+                os.remove(stale_path)
+    except Exception:
+        # A failed cache write is never fatal; keep parsing the CSV each session
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    
+    return data
+
+@st.cache_resource
 def load_data():
     """Load the processed data with better error handling"""
-    # Check if files exist
-    required_files = ['final_reviews_with_analysis.csv', 'product_ratings_analysis.csv']
+    required_columns_df = ['asin', 'reviewText_english', 'sentiment_label', 'reviewerName', 'overall', 'detected_language']
+    required_columns_ratings = ['avg_rating', 'combined_rating', 'avg_sentiment', 'review_count']
+    
+    # Only load the columns the app uses, with compact dtypes
+    read_options = {
+        'final_reviews_with_analysis.csv': {
+            'columns': required_columns_df,
+            'dtype': {'asin': 'category', 'sentiment_label': 'category', 'detected_language': 'category', 'overall': 'float32'}
+        },
+        'product_ratings_analysis.csv': {
+            'columns': ['asin'] + required_columns_ratings,
+            'dtype': {'avg_rating': 'float32', 'combined_rating': 'float32', 'avg_sentiment': 'float32', 'review_count': 'int32'},
+            'index_col': 0
+        }
+    }
+    
+    # Check if files exist, either as the CSV or a Parquet copy matching the read options
     missing_files = []
     
-    for file in required_files:
-        if not os.path.exists(file):
+    for file, options in read_options.items():
+        if not os.path.exists(file) and not os.path.exists(parquet_cache_path(file, **options)):
             missing_files.append(file)
     
     if missing_files:
@@ -80,13 +150,10 @@ def load_data():
     try:
         # Try to load the final processed data
         st.info("📂 Loading data files...")
-        df = pd.read_csv('final_reviews_with_analysis.csv')
-        product_ratings = pd.read_csv('product_ratings_analysis.csv', index_col=0)
+        df = read_csv_cached('final_reviews_with_analysis.csv', **read_options['final_reviews_with_analysis.csv'])
+        product_ratings = read_csv_cached('product_ratings_analysis.csv', **read_options['product_ratings_analysis.csv'])
         
         # Validate data structure
-        required_columns_df = ['asin', 'reviewText_english', 'sentiment_label', 'reviewerName', 'overall', 'detected_language']
-        required_columns_ratings = ['avg_rating', 'combined_rating', 'avg_sentiment', 'review_count']
-        
         missing_cols_df = [col for col in required_columns_df if col not in df.columns]
         missing_cols_ratings = [col for col in required_columns_ratings if col not in product_ratings.columns]
         
@@ -98,6 +165,9 @@ def load_data():
             st.error(f"❌ Missing columns in ratings data: {', '.join(missing_cols_ratings)}")
             return None, None
         
+        # Ratings are whole stars
+        df['overall'] = df['overall'].astype('int8')
+        
         st.success(f"✅ Successfully loaded {len(df)} reviews for {len(product_ratings)} products")
         return df, product_ratings
         
@@ -112,32 +182,80 @@ def load_data():
         st.info("Please check your data files and try again.")
         return None, None
 
-def get_top_words(text_series, top_n=5):
-    """Extract top N most frequent words from review text"""
-    # Combine all text
-    all_text = ' '.join(text_series.fillna('').astype(str))
+@st.cache_resource(hash_funcs={pd.DataFrame: id})
+def build_product_index(df):
+    """Sort reviews by ASIN once so per-product lookups avoid full-frame scans"""
+    # Stable sort keeps each product's reviews in their original order
+    df_sorted = df.sort_values('asin', kind='mergesort').reset_index(drop=True)
+    df_indexed = df_sorted.set_index('asin', drop=False)
+    asin_counts = df.groupby('asin', sort=False, observed=True).size().to_dict()
+    
+    return df_indexed, asin_counts
+
+@st.cache_resource(hash_funcs={pd.DataFrame: id})
+def build_product_options(df):
+    """Build the sidebar dropdown labels with review counts for every product"""
+    counts = df['asin'].value_counts(sort=False)
+    labels = counts.index.astype(str) + ' (' + counts.to_numpy().astype(str) + ' reviews)'
     
-    # Clean text and extract words
-    words = re.findall(r'\b[a-zA-Z]{3,}\b', all_text.lower())
+    return labels.tolist()
+
+def _tokenize_reviews(df):
+    """Split reviews into (asin, word) rows"""
+    # Flatten to one (asin, word) row per token
+    tokens = df[['asin']].assign(
+        word=df['reviewText_english'].fillna('').astype(str).str.lower().str.findall(_WORD_RE)
+    ).explode('word').dropna(subset=['word'])
     
     # Remove common words that aren't meaningful
-    stop_words = {'the', 'and', 'for', 'are', 'but', 'not', 'you', 'all', 'can', 'had', 'her', 'was', 'one', 'our', 'out', 'day', 'get', 'has', 'him', 'his', 'how', 'man', 'new', 'now', 'old', 'see', 'two', 'way', 'who', 'boy', 'did', 'its', 'let', 'put', 'say', 'she', 'too', 'use'}
-    
-    filtered_words = [word for word in words if word not in stop_words]
+    return tokens[~tokens['word'].isin(STOP_WORDS)]
+
+def _count_tokens(tokens):
+    """Count (asin, word) pairs using packed integer keys"""
+    # Reviews without an ASIN have code -1 and would be counted under the last product
+    tokens = tokens[tokens['asin'].notna()]
+    
+    # Map words to ids and pack (asin code, word id) into one int64 key
+    word_ids, vocab = pd.factorize(tokens['word'])
+    n_words = max(len(vocab), 1)
+    asin_ids = tokens['asin'].cat.codes.to_numpy(np.int64)
+    keys = asin_ids * n_words + word_ids
+    
+    # Count each key in first-seen order so ties keep their original ranking
+    key_ids, unique_keys = pd.factorize(keys)
+    counts = np.bincount(key_ids, minlength=len(unique_keys))
+    
+    return pd.DataFrame({
+        'asin': tokens['asin'].cat.categories.take(unique_keys // n_words),
+        'word': vocab.take(unique_keys % n_words),
+        'count': counts
+    })
+
+@st.cache_resource(hash_funcs={pd.DataFrame: id})
+def build_word_index(df, top_n=20):
+    """Tokenize every review once and keep each product's most frequent words"""
+    counts = _count_tokens(_tokenize_reviews(df))
     
-    # Count frequency
-    word_counts = Counter(filtered_words)
+    return {asin: group.nlargest(top_n, 'count') for asin, group in counts.groupby('asin', sort=False)}
+
+def get_top_words(word_index, product_code, top_n=5):
+    """Get top N most frequent words for a product from the word index"""
+    if product_code not in word_index:
+        return []
     
-    return word_counts.most_common(top_n)
+    top_words = word_index[product_code].head(top_n)
+    return list(zip(top_words['word'], top_words['count']))
 
 def generate_summary(reviews, max_length=200):
     """Generate a short summary from reviews"""
     # Take first few reviews and create summary
-    sample_reviews = reviews.head(3).tolist()
+    # Only the first max_length characters can reach the summary, so trim long reviews
+    sample_reviews = [review[:max_length * 2] for review in reviews.head(3).fillna('').astype(str).tolist()]
     combined_text = ' '.join(sample_reviews)
     
     # Simple extractive summary - take first sentences
-    sentences = combined_text.split('.')
+    # Stop splitting once the first two sentences are found
+    sentences = combined_text.split('.', 2)
     summary = '. '.join(sentences[:2])
     
     if len(summary) > max_length:
@@ -145,16 +263,83 @@ def generate_summary(reviews, max_length=200):
     
     return summary.strip()
 
+@st.cache_resource(hash_funcs={pd.DataFrame: id})
+def build_summaries(df):
+    """Generate the review summary for every product once"""
+    return {
+        asin: generate_summary(reviews)
+        for asin, reviews in df.groupby('asin', sort=False, observed=True)['reviewText_english']
+    }
+
+@st.cache_resource(hash_funcs={pd.DataFrame: id})
+def build_sentiment_tables(df):
+    """Count sentiment labels per product and across all reviews once"""
+    sent_pivot = pd.crosstab(df['asin'], df['sentiment_label'])
+    global_sent = df['sentiment_label'].value_counts()
+    
+    return sent_pivot, global_sent
+
+# Figures are cached as shared objects: st.cache_data would unpickle and
+# re-validate a Plotly figure on every hit, which costs more than building it
+@st.cache_resource
+def _build_sentiment_pie(sentiment_counts):
+    """Build the sentiment pie chart from (label, count) pairs"""
+    labels, counts = zip(*sentiment_counts) if sentiment_counts else ((), ())
+    
+    return px.pie(
+        values=list(counts),
+        names=list(labels),
+        title="Review Sentiment Distribution",
+        color_discrete_map={
+            'positive': '#28a745',
+            'negative': '#dc3545', 
+            'neutral': '#6c757d'
+        }
+    )
+
+@st.cache_resource
+def _build_rating_gauge(avg_rating, combined_rating):
+    """Build the combined rating gauge chart"""
+    fig_gauge = go.Figure(go.Indicator(
+        mode = "gauge+number+delta",
+        value = combined_rating,
+        domain = {'x': [0, 1], 'y': [0, 1]},
+        title = {'text': "Combined Rating"},
+        delta = {'reference': avg_rating},
+        gauge = {
+            'axis': {'range': [None, 5]},
+            'bar': {'color': "darkblue"},
+            'steps': [
+                {'range': [0, 2], 'color': "lightgray"},
+                {'range': [2, 4], 'color': "gray"},
+                {'range': [4, 5], 'color': "lightgreen"}
+            ],
+            'threshold': {
+                'line': {'color': "red", 'width': 4},
+                'thickness': 0.75,
+                'value': 4.5
+            }
+        }
+    ))
+    fig_gauge.update_layout(height=300)
+    
+    return fig_gauge
+
 def analyze_product(df, product_ratings, product_code):
     """Analyze and display product information"""
     
-    # Filter data for selected product
-    product_reviews = df[df['asin'] == product_code]
+    df_indexed, asin_counts = build_product_index(df)
+    word_index = build_word_index(df)
+    summaries = build_summaries(df)
+    sent_pivot, _ = build_sentiment_tables(df)
     
-    if len(product_reviews) == 0:
+    if product_code not in asin_counts:
         st.error("No reviews found for this product!")
         return
     
+    # Look up the product's reviews on the sorted ASIN index
+    product_reviews = df_indexed.loc[[product_code]]
+    
     # Get product rating info
     try:
         rating_info = product_ratings.loc[product_code]
@@ -173,34 +358,26 @@ def analyze_product(df, product_ratings, product_code):
         
         # Top 5 most frequent words
         st.subheader("🔤 Top 5 Most Frequent Words")
-        top_words = get_top_words(product_reviews['reviewText_english'], 5)
+        top_words = get_top_words(word_index, product_code, 5)
         
         if top_words:
-            word_cols = st.columns(5)
-            for i, (word, count) in enumerate(top_words):
-                with word_cols[i]:
-                    st.markdown(f'''
-                    <div class="metric-card">
-                        <h3 style="color: #1f77b4; margin: 0;">{word}</h3>
-                        <p style="margin: 0; color: #666;">({count} times)</p>
-                    </div>
-                    ''', unsafe_allow_html=True)
+            # Render all word cards in one flex row with a single markdown call
+            word_cards = ''.join(
+                f'<div class="metric-card" style="flex: 1;">'
+                f'<h3 style="color: #1f77b4; margin: 0;">{word}</h3>'
+                f'<p style="margin: 0; color: #666;">({count} times)</p>'
+                f'</div>'
+                for word, count in top_words
+            )
+            st.markdown(f'<div style="display: flex; gap: 1rem;">{word_cards}</div>', unsafe_allow_html=True)
         
         # Sentiment Analysis
         st.subheader("😊 Sentiment Analysis")
-        sentiment_counts = product_reviews['sentiment_label'].value_counts()
+        sentiment_counts = sent_pivot.loc[product_code]
+        sentiment_counts = sentiment_counts[sentiment_counts > 0]
         
         # Create sentiment chart
-        fig = px.pie(
-            values=sentiment_counts.values, 
-            names=sentiment_counts.index,
-            title="Review Sentiment Distribution",
-            color_discrete_map={
-                'positive': '#28a745',
-                'negative': '#dc3545', 
-                'neutral': '#6c757d'
-            }
-        )
+        fig = _build_sentiment_pie(tuple((str(label), int(count)) for label, count in sentiment_counts.items()))
         st.plotly_chart(fig, use_container_width=True)
         
         # Sentiment summary
@@ -226,28 +403,7 @@ def analyze_product(df, product_ratings, product_code):
         combined_rating = rating_info['combined_rating']
         
         # Create gauge chart for rating
-        fig_gauge = go.Figure(go.Indicator(
-            mode = "gauge+number+delta",
-            value = combined_rating,
-            domain = {'x': [0, 1], 'y': [0, 1]},
-            title = {'text': "Combined Rating"},
-            delta = {'reference': avg_rating},
-            gauge = {
-                'axis': {'range': [None, 5]},
-                'bar': {'color': "darkblue"},
-                'steps': [
-                    {'range': [0, 2], 'color': "lightgray"},
-                    {'range': [2, 4], 'color': "gray"},
-                    {'range': [4, 5], 'color': "lightgreen"}
-                ],
-                'threshold': {
-                    'line': {'color': "red", 'width': 4},
-                    'thickness': 0.75,
-                    'value': 4.5
-                }
-            }
-        ))
-        fig_gauge.update_layout(height=300)
+        fig_gauge = _build_rating_gauge(float(avg_rating), float(combined_rating))
         st.plotly_chart(fig_gauge, use_container_width=True)
         
         # Rating details
@@ -260,42 +416,56 @@ def analyze_product(df, product_ratings, product_code):
     
     # Review Summary
     st.subheader("📝 Review Summary")
-    summary = generate_summary(product_reviews['reviewText_english'])
+    summary = summaries[product_code]
     st.markdown(f'<div class="product-card">{summary}</div>', unsafe_allow_html=True)
     
     # Sample reviews
     with st.expander("📖 View Sample Reviews"):
         sample_reviews = product_reviews.head(3)
-        for idx, review in sample_reviews.iterrows():
-            st.markdown(f"**Reviewer:** {review['reviewerName']}")
-            st.markdown(f"**Rating:** {'⭐' * int(review['overall'])}")
-            st.markdown(f"**Sentiment:** {review['sentiment_label'].title()}")
-            st.markdown(f"**Review:** {review['reviewText_english'][:200]}...")
+        for review in sample_reviews.itertuples(index=False):
+            st.markdown(f"**Reviewer:** {review.reviewerName}")
+            st.markdown(f"**Rating:** {'⭐' * int(review.overall)}")
+            st.markdown(f"**Sentiment:** {review.sentiment_label.title()}")
+            st.markdown(f"**Review:** {review.reviewText_english[:200]}...")
             st.markdown("---")
 
+@st.cache_resource(hash_funcs={pd.DataFrame: id})
+def general_stats(df, product_ratings):
+    """Compute the dataset overview figures once"""
+    _, sentiment_dist = build_sentiment_tables(df)
+    
+    return {
+        'n_reviews': len(df),
+        'n_products': df['asin'].nunique(),
+        'n_languages': df['detected_language'].nunique(),
+        'top_products': product_ratings.nlargest(10, 'review_count')[['avg_rating', 'combined_rating', 'review_count']],
+        'sentiment_dist': sentiment_dist
+    }
+
 def show_general_stats(df, product_ratings):
     """Show general statistics when no product is selected"""
+    stats = general_stats(df, product_ratings)
+    
     st.markdown("## 📈 Dataset Overview")
     
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        st.metric("Total Reviews", len(df))
+        st.metric("Total Reviews", stats['n_reviews'])
     with col2:
-        st.metric("Total Products", df['asin'].nunique())
+        st.metric("Total Products", stats['n_products'])
     with col3:
-        st.metric("Avg Reviews per Product", f"{len(df) / df['asin'].nunique():.1f}")
+        st.metric("Avg Reviews per Product", f"{stats['n_reviews'] / stats['n_products']:.1f}")
     with col4:
-        st.metric("Languages Detected", df['detected_language'].nunique())
+        st.metric("Languages Detected", stats['n_languages'])
     
     # Top products
     st.subheader("🏆 Top Products by Review Count")
-    top_products = product_ratings.nlargest(10, 'review_count')[['avg_rating', 'combined_rating', 'review_count']]
-    st.dataframe(top_products, use_container_width=True)
+    st.dataframe(stats['top_products'], use_container_width=True)
     
     # Sentiment distribution
     st.subheader("😊 Overall Sentiment Distribution")
-    sentiment_dist = df['sentiment_label'].value_counts()
+    sentiment_dist = stats['sentiment_dist']
     fig = px.bar(x=sentiment_dist.index, y=sentiment_dist.values, 
                 title="Sentiment Distribution Across All Reviews",
                 color=sentiment_dist.index,
@@ -320,15 +490,11 @@ def main():
     # Sidebar for input
     st.sidebar.header("🔍 Search Product")
     
-    # Get unique products for dropdown
-    unique_products = df['asin'].unique()
-    unique_names = df.groupby('asin')['reviewerName'].first().to_dict()
+    # Known products, for validating manually entered codes
+    _, asin_counts = build_product_index(df)
     
-    # Create product options with names
-    product_options = []
-    for asin in unique_products:
-        review_count = len(df[df['asin'] == asin])
-        product_options.append(f"{asin} ({review_count} reviews)")
+    # Create product options with review counts
+    product_options = build_product_options(df)
     
     # Input methods
     input_method = st.sidebar.radio("Choose input method:", ["Select from list", "Enter product code manually"])
@@ -342,7 +508,7 @@ def main():
     else:
         entered_code = st.sidebar.text_input("Enter product code (ASIN):")
         if entered_code:
-            if entered_code in unique_products:
+            if entered_code in asin_counts:
                 selected_product = entered_code
             else:
                 st.sidebar.error("Product code not found!")